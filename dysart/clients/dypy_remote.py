@@ -12,6 +12,7 @@ import numbers
 import os
 import pickle
 import random
+import struct
 from typing import *
 
 import requests
@@ -20,6 +21,10 @@ import graphviz
 # This intentionally-global variable controls how much stuff is printed
 verbose = True
 
+# The content type of a pickle whose large buffers are sent out-of-band, after
+# it. See `unpack_pickle` for the format.
+PICKLE_OOB_CONTENT_TYPE = 'application/x-dysart-pickle-oob'
+
 class Client:
     """
     """
@@ -40,6 +45,10 @@ class Client:
         self.port = port
         self.url = f"http://{hostname}:{port}"
         self.verbose = verbose
+        # Share one connection pool across requests, so that repeated calls
+        # reuse a kept-alive connection to the server instead of opening a
+        # new one each time.
+        self.session = requests.Session()
         try:
             self.__load_token()
         except (FileNotFoundError, KeyError):
@@ -61,7 +70,7 @@ class Client:
         data = {
             'project': name,
         }
-        response = requests.post(url, json=data, auth=self._auth())
+        response = self.session.post(url, json=data, auth=self._auth())
         response.raise_for_status()
         response_data = json.loads(response.content)
         proj = RemoteProject(self, name, token=token)
@@ -132,7 +141,7 @@ class Client:
         """
         if verbose:
             print("Attempting to suspend execution... ")
-        response = requests.post(self.url + '/debug', auth=self._auth())
+        response = self.session.post(self.url + '/debug', auth=self._auth())
         response.raise_for_status()
         if verbose:
             print("Resumed.")
@@ -147,6 +156,29 @@ class RemoteProject:
         self.name = name
         self.token = token
 
+    def batch(self, *calls: Tuple[str, str, tuple, dict]) -> List[Any]:
+        """Calls several feature methods in a single request.
+
+        Args:
+            calls: tuples of (feature name, method name, args, kwargs)
+
+        Returns: the methods' return values, in the order they were given
+
+        """
+        data = {
+            'project': self.name,
+            'calls': [
+                {'feature': feature, 'method': method,
+                 'args': args, 'kwargs': kwargs}
+                for feature, method, args, kwargs in calls
+            ]
+        }
+        response = self.client.session.post(
+            self.client.url + '/feature/batch', json=data,
+            auth=self.client._auth()
+        )
+        return RemoteProcedureCall.interp_response(response)
+
     def _repr_svg_(self):
         """Define this to get nice formatting in a Jupyter notebook
         
@@ -170,8 +202,8 @@ class RemoteFeature:
             'project': self.project.name,
             'feature': self.name,
         }        
-        response = requests.get(self.url, json=data,
-                                auth=self.project.client._auth())
+        client = self.project.client
+        response = client.session.get(self.url, json=data, auth=client._auth())
         response.raise_for_status()
         return feature_html_table(json.loads(response.content))
 
@@ -194,8 +226,9 @@ class RemoteProcedureCall:
         if verbose:
             print("Issuing request... ", end='')
         try:
-            response = requests.post(self.feature.url, json=data,
-                                     auth=self.feature.project.client._auth())
+            client = proj.client
+            response = client.session.post(self.feature.url, json=data,
+                                           auth=client._auth())
             value = RemoteProcedureCall.interp_response(response)
             if verbose:
                 print('done.')
@@ -207,9 +240,36 @@ class RemoteProcedureCall:
     @staticmethod
     def interp_response(response):
         response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if content_type.startswith('application/json'):
+            return json.loads(response.content)
+        if content_type.startswith(PICKLE_OOB_CONTENT_TYPE):
+            return unpack_pickle(response.content)
         return pickle.loads(response.content)
 
 
+def unpack_pickle(content: bytes) -> Any:
+    """Unpickles a response body carrying a pickle and its out-of-band
+    buffers. The body starts with a header of little-endian integers: the
+    number of buffers (4 bytes), then the length of the pickle and of each
+    buffer (8 bytes each). Then come the pickle, and the buffers in order.
+
+    The buffers are handed to the unpickler without further copies, so that
+    e.g. numpy arrays are built directly on top of them.
+    """
+    # Copy once into a mutable buffer, so that arrays built on it are writable
+    view = memoryview(bytearray(content))
+    n_buffers, = struct.unpack_from('<I', view)
+    offset = struct.calcsize('<I')
+    lengths = struct.unpack_from(f'<{n_buffers + 1}Q', view, offset)
+    offset += struct.calcsize(f'<{n_buffers + 1}Q')
+    parts = []
+    for length in lengths:
+        parts.append(view[offset:offset + length])
+        offset += length
+    return pickle.loads(parts[0], buffers=parts[1:])
+
+
 def feature_html_table(repr: dict) -> str:
     """
     
@@ -12,11 +12,16 @@ without having to think about _anything_ more than the highest layer defined by
 the last person who touched the system.
 """
 
+import asyncio
+import contextlib
 import datetime as dt
 import enum
+import functools
 import hashlib
 import inspect
+import logging
 import sys
+import threading
 from collections import OrderedDict
 from typing import *
 
@@ -25,6 +30,8 @@ import mongoengine as me
 import dysart.messages.messages as messages
 from dysart.records import RequestRecord
 
+logger = logging.getLogger(__name__)
+
 
 class ExpirationStatus(enum.Enum):
     FRESH = enum.auto()
@@ -33,7 +40,7 @@ class ExpirationStatus(enum.Enum):
 
 class exposed:
     """This decorator class annotates a method that is exposed by the client-
-    facing API.
+    facing API. Callers on other threads must hold the feature's `call_lock`.
     """
 
     exposed = True
@@ -44,15 +51,42 @@ class exposed:
         self.__doc__ = fn.__doc__
 
     def __get__(self, obj, objtype):
-        """Hack to bind this callable to the parent object.
+        """Binds this callable to the parent object. Each access returns its
+        own bound copy, so a reference that has been handed out (or is being
+        called on another thread) isn't rebound by later lookups through
+        other instances.
         """
-        self.obj = obj
-        return self
+        if obj is None:
+            return self
+        bound = type(self).__new__(type(self))
+        bound.__dict__.update(self.__dict__)
+        bound.obj = obj
+        return bound
 
     def __call__(self, *args, **kwargs):
+        # An exposed method may change what the feature reports about itself
+        self.obj.forget_repr()
         return self.fn(self.obj, *args, **kwargs)
 
 
+@functools.lru_cache(maxsize=None)
+def exposed_names(cls: type) -> Tuple[str, ...]:
+    """Returns the names of the exposed methods of a class. This only depends
+    on the class, so it's worked out once per class.
+    """
+    return tuple(name for name in dir(cls)
+                 if isinstance(getattr(cls, name, None), exposed))
+
+
+@functools.lru_cache(maxsize=None)
+def refresh_names(cls: type) -> FrozenSet[str]:
+    """Returns the names of the exposed methods of a class that refresh the
+    feature before they are called.
+    """
+    return frozenset(name for name in exposed_names(cls)
+                     if getattr(getattr(cls, name), 'is_refresh', False))
+
+
 def refresh(fn):
     """Decorator that flags a method as having dependencies and possibly requiring
     a refresh operation. Refresh methods are always exposed.
@@ -84,6 +118,9 @@ class Feature(me.Document):
     def __init__(self, **kwargs):
         # Create a new document
         super().__init__(**kwargs)
+        # Held by whoever is touching this feature's document or memoized
+        # state, which aren't safe to change from two threads at once.
+        self.call_lock = threading.Lock()
         self.save()
 
     @exposed
@@ -178,20 +215,22 @@ class Feature(me.Document):
             Propagate `manual_expiration_switch` to children.
 
         """
-        record.setup()
-        try:
-            await self.exec_async_dunder('pre_hook', record)
-            # Call the feature.
-            return_value = await self.exec_async_dunder('call')
-            await self.exec_async_dunder('validation_hook', record, return_value)
-            self.manual_expiration_switch = False
-            self.save()
-            record.conclude(CallStatus.DONE)
-        except Exception as e:
-            record.conclude(CallStatus.FAILED)
-            raise e
-        await self.exec_async_dunder('post_hook', record)
-        return return_value
+        async with holding(self.call_lock):
+            record.setup()
+            self.forget_repr()
+            try:
+                await self.exec_async_dunder('pre_hook', record)
+                # Call the feature.
+                return_value = await self.exec_async_dunder('call')
+                await self.exec_async_dunder('validation_hook', record, return_value)
+                self.manual_expiration_switch = False
+                self.save()
+                record.conclude(CallStatus.DONE)
+            except Exception as e:
+                record.conclude(CallStatus.FAILED)
+                raise e
+            await self.exec_async_dunder('post_hook', record)
+            return return_value
 
     @property
     def parents(self):
@@ -237,6 +276,24 @@ class Feature(me.Document):
             acc[self] = True
         return acc
 
+    async def expired_levels(self) -> List[List['Feature']]:
+        """Groups the features returned by `expired_ancestors` into levels,
+        such that each feature's expired parents are all in earlier levels.
+        Features in the same level don't depend on one another.
+
+        Returns: A list of levels, in the order that they should be refreshed.
+
+        """
+        depths = {}
+        # expired_ancestors is topologically sorted, so parents come first
+        for feature in await self.expired_ancestors():
+            depths[feature] = 1 + max((depths[parent] for parent in feature.parents.values()
+                                       if parent in depths), default=-1)
+        levels = [[] for _ in range(max(depths.values(), default=-1) + 1)]
+        for feature, depth in depths.items():
+            levels[depth].append(feature)
+        return levels
+
     def expiry_override(self) -> bool:
         """A hard override function that may be overridden (excuse me) by
         subclasses to provide additional incontrovertible expiry conditions,
@@ -263,11 +320,36 @@ class Feature(me.Document):
             self.parent_ids[parent_key] = parent_id
         self.save()
 
+    def forget_repr(self) -> None:
+        """Drops the memoized value of `_repr_dict_`, if a subclass keeps one,
+        since the state it reports may have changed. The caller must hold
+        `call_lock`.
+        """
+        self.__dict__.pop('_repr_cache', None)
+
     def exposed_methods(self) -> List[callable]:
         """Gets a list of all the methods of this class annotated with @result
         """
-        return [getattr(self, name) for name in dir(self)
-                if isinstance(getattr(self, name, None), exposed)]
+        return [getattr(self, name) for name in exposed_names(type(self))]
+
+
+@contextlib.asynccontextmanager
+async def holding(lock: threading.Lock):
+    """Holds a thread lock from a coroutine. If the lock is taken, it's
+    waited for on a worker thread, so that the event loop keeps running.
+    """
+    if not lock.acquire(blocking=False):
+        acquired = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # The lock is taken all the same; give it back once it is.
+            acquired.add_done_callback(lambda _: lock.release())
+            raise
+    try:
+        yield
+    finally:
+        lock.release()
 
 
 class CallStatus(enum.Enum):
@@ -283,13 +365,26 @@ class CallRecord(me.Document):
     Uniquely identified (with high probability) by a 40-character hexadecimal
     string.
 
+    A record isn't written to the database as it is set up or concluded:
+    whoever creates it owns its persistence, and should pass it to
+    `save_call_records` once the call is over. Until then, the call isn't
+    visible in the database.
+
     Todo:
         I can't see how to put this into another source file (say, records.py)
         without having a circular import, but that seems like a desirable thing
         to do.
     """
 
-    meta = {'allow_inheritance': True}
+    # Records are looked up by feature, most recent first (e.g. by the
+    # expiration hooks), so index that access pattern. The queries don't
+    # filter on subclass, so leave `_cls` out of the index.
+    meta = {
+        'allow_inheritance': True,
+        'indexes': [
+            {'fields': ['feature', '-stop_time'], 'cls': False},
+        ],
+    }
 
     UUID_LEN = 40
 
@@ -318,7 +413,6 @@ class CallRecord(me.Document):
         if hasattr(feature, 'template_diffs'):
             self.template_diffs = feature.template_diffs
         self.request = request
-        self.save()
 
     def __setattr__(self, key, value):
         """The `exit_status` field should be a string, so handle this
@@ -340,14 +434,12 @@ class CallRecord(me.Document):
         """
         self.start_time = dt.datetime.now()
         self.__gen_uuid()
-        self.save()
 
     def conclude(self, status: CallStatus):
         """ ...and this one tears it down
         """
         self.exit_status = status
         self.stop_time = dt.datetime.now()
-        self.save()
 
     def __str__(self):
         s = self.uuid[:16] + '...\n'
@@ -378,6 +470,24 @@ class CallRecord(me.Document):
         self.uuid = h.hexdigest()[:CallRecord.UUID_LEN]
 
 
+def save_call_records(records: List[CallRecord]) -> None:
+    """Writes a batch of concluded call records to the database in a single
+    round trip. Records aren't saved as they go through setup and conclusion;
+    whoever issues the calls is responsible for saving them afterwards.
+
+    A failure to write is logged rather than raised, so that it doesn't hide
+    how the calls themselves went.
+    """
+    if not records:
+        return
+    try:
+        CallRecord._get_collection().insert_many(
+            [record.to_mongo() for record in records], ordered=False
+        )
+    except Exception:
+        logger.exception("Failed to save %d call records", len(records))
+
+
 def get_records_by_uid_pre(uid_pre):
     """Takes a uid prefix and searches for a record whose uid contains this
     substring.
@@ -1,7 +1,7 @@
 import datetime
 from typing import Callable
 
-from dysart.feature import Feature, ExpirationStatus
+from dysart.feature import Feature, CallRecord, ExpirationStatus
 
 
 def always_fresh(feature: Feature) -> ExpirationStatus:
@@ -42,8 +42,17 @@ def timeout(**kwargs) -> Callable:
     timeout_delta = datetime.timedelta(**kwargs)
 
     def hook(feature: Feature) -> ExpirationStatus:
-        last_query = feature.call_records().order_by('-stop_time')[0]
-        delta = datetime.datetime.now() - last_query.stop_time
+        # Only the stop time of the latest call is needed, so ask the
+        # collection for that field alone instead of decoding whole records.
+        last_query = CallRecord._get_collection().find_one(
+            {'feature': feature.id},
+            {'stop_time': True},
+            sort=[('stop_time', -1)]
+        )
+        if last_query is None or last_query.get('stop_time') is None:
+            # Never measured, so there is nothing to be fresh.
+            return ExpirationStatus.EXPIRED
+        delta = datetime.datetime.now() - last_query['stop_time']
         if delta > timeout_delta:
             return ExpirationStatus.EXPIRED
         else:
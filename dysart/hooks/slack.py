@@ -13,12 +13,25 @@ client = WebClient(token=conf.config['slack_api_token'],
                    run_async=True)
 
 
+def _share_session() -> None:
+    """Gives the Slack client one long-lived aiohttp session. Otherwise it
+    opens (and tears down) a new session, with a new connection, for every
+    message it posts. This has to happen inside the running event loop, so
+    it's done on first use rather than at import.
+    """
+    if client.session is None or client.session.closed:
+        client.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=300)
+        )
+
+
 def to_channel(channel: str):
     @post_hook
     async def hook(record: CallRecord):
         with messages.FormatContext('slack'):
             text = record_message(record)
         try:
+            _share_session()
             response = await client.chat_postMessage(
                 channel=channel,
                 text=text
@@ -44,6 +57,7 @@ def to_users(*users: List[str]):
             with messages.FormatContext('slack'):
                 text = record_message(record)
             try:
+                _share_session()
                 response = await client.chat_postMessage(
                     channel=channel_id,
                     text=text
@@ -113,13 +113,8 @@ class result(exposed):
         self.__name__ = wrapped_fn.__name__  # TODO: using `wraps` right?
         self.__doc__ = wrapped_fn.__doc__
 
-    def __get__(self, obj, objtype):
-        """Hack to bind this callable to the parent object.
-        """
-        self.obj = obj
-        return self
-
     def __call__(self, *args, **kwargs):
+        self.obj.forget_repr()
         return self.wrapped_fn(self.obj, *args, **kwargs)
 
 
@@ -296,7 +291,15 @@ class LabberFeature(Feature):
     def _repr_dict_(self) -> dict:
         """Overriding Feature.repr_table, this method returns a formatted report on the
         easily-representable (i.e. scalar-valued) result methods.
+
+        The report is memoized until the feature is next executed, or one of
+        its exposed methods is called. Callers get their own shallow copy, and
+        must hold `call_lock`, as computing the report may fill in results.
         """
+        try:
+            return dict(self._repr_cache)
+        except AttributeError:
+            pass
         table = {
             'id': self.id,
         }
@@ -306,7 +309,8 @@ class LabberFeature(Feature):
                 results[key] = 'Non-numeric result'
         table['results'] = results
         table['diffs'] = self.template_diffs
-        return table
+        self._repr_cache = table
+        return dict(table)
 
     def all_results(self, index=-1) -> dict:
         """Returns a dict containing all the result values, even if they haven't been
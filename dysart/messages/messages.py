@@ -5,6 +5,7 @@ recursively-called status lines.
 """
 
 import os
+import queue
 import sys
 import datetime as dt
 from functools import wraps
@@ -12,12 +13,15 @@ import getpass
 import inspect
 from io import StringIO
 import logging
+import logging.handlers
 import platform
 import textwrap
 
 import toplevel.conf as conf
 from dysart.messages.errors import DysartError
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_COL = 48
 TAB = ' ' * 4
 
@@ -148,7 +152,7 @@ def write_log(message: str):
     """
     Write a message to a log file with date and time information.
     """
-    logging.info(message)
+    logger.info(message)
 
 
 def logged(stdout=True, message='log event', **kwargs):
@@ -198,24 +202,52 @@ def logged(stdout=True, message='log event', **kwargs):
     return decorator
 
 
+class _ListeningQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler that stops the listener draining its queue when it's
+    closed. `logging.shutdown` closes it, whether it's run at exit or before
+    the process is replaced, so whatever is still queued gets written.
+    """
+
+    def __init__(self, queue, listener: logging.handlers.QueueListener):
+        super().__init__(queue)
+        self.listener = listener
+
+    def close(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
 def configure_logging(logfile=''):
     """
-    Set up the logging module to write to the correct logfile, etc.
+    Set up the logging module to write to the correct logfile, etc. Records
+    are handed off through a queue to a background thread that writes them,
+    so that logging from a request handler never waits on the disk.
     """
 
+    root = logging.getLogger()
+    if root.handlers:
+        # Already configured; like `logging.basicConfig`, do nothing.
+        return
+
     if logfile == '' or logfile is None:
         # Set the log output to the null file. This should actually be cross-
         # platform, i.e. equal to '/dev/null' on unix systems and 'NULL' on
         # windows.
         logfile = os.devnull
 
-    # TODO: I should really take advantage of some of the more advanced
-    # features of the logging module.
     user = getpass.getuser()
     log_format = '%(asctime)s | ' + user + " | %(message)s"
     date_format = '%m/%d/%Y %I:%M:%S'
-    logging.basicConfig(format=log_format, filename=logfile,
-                        datefmt=date_format, level='INFO')
+    file_handler = logging.FileHandler(logfile)
+    file_handler.setFormatter(logging.Formatter(log_format, date_format))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    root.addHandler(_ListeningQueueHandler(log_queue, listener))
+    root.setLevel('INFO')
 
 
 def tree(obj, get_deps: callable, pipe='│', dash='─', tee='├',
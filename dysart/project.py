@@ -9,6 +9,21 @@ import toplevel.conf as conf
 
 import mongoengine as me
 import yaml
+# The C bindings to libyaml are much faster, but aren't always built.
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+def _read_project_file(path: str) -> Dict:
+    """Parses a project file.
+
+    Raises:
+        FileNotFoundError: if there is no project file at `path`
+    """
+    with open(path, 'r') as f:
+        return yaml.load(f, _Loader)
 
 
 class Project:
@@ -16,37 +31,34 @@ class Project:
     feature loading.
     """
 
+    # The kinds of hooks that may be attached to a feature in a project file
+    hook_types = ('pre_hook', 'post_hook', 'expiration_hook')
+
     def __init__(self, project_path: str):
         self.path = os.path.expanduser(project_path)
-        with open(self.path, 'r') as f:
-            try:
-                proj_yaml = yaml.load(f, yaml.Loader)
-            except FileNotFoundError:
-                # TODO maybe handle the failure case more gracefully.
-                # TODO reuse code from the messages module to print error messages consistently
-                print("Error: failed to find Dysart project at", project_path)
-                return
+        try:
+            proj_yaml = _read_project_file(self.path)
+        except FileNotFoundError:
+            # TODO maybe handle the failure case more gracefully.
+            # TODO reuse code from the messages module to print error messages consistently
+            print("Error: failed to find Dysart project at", project_path)
+            return
 
         self.feature_modules = {}    # Feature modules that have been included
         self.hook_modules = {}       # Hook modules that have been included
         self.features = {}           # Features that have been included, indexed by ID
         self.feature_ids = {}        # IDs indexed by feature name
+        self._hooks = {}             # Resolved hooks indexed by hook name
+        self._feature_classes = {}   # Resolved feature classes indexed by class name
+        self._dir_cache = {}         # Directory listings of the module search paths
 
-        # Next, import the libraries specified in the project specification
-        for mod_path in proj_yaml['Modules']['Features']:
-            self.load_feature_module(mod_path)
-
-        for mod_path in proj_yaml['Modules']['Hooks']:
-            self.load_hook_module(mod_path)
-
-        # Finally, include the features.
+        # Check that every feature is defined correctly before doing any real
+        # work, and reject the load if there are errors. This way a malformed
+        # project doesn't execute any modules or touch the database.
         for feature_name, feature_meta in proj_yaml['Features'].items():
             # `feature_ident` is the feature identifier that will become its variable name
             # in the global scope. This is distinct from the `id` field within `feature_meta`,
             # which is used as a database index.
-            # TODO
-            # Check that the feature is defined correctly, and reject the load if there are errors.
-
             try:
                 self.__validate_feature_yaml(feature_name, feature_meta)
             except ValidationError as e:
@@ -55,10 +67,52 @@ class Project:
                 print(f"Error: {e}", sys.stderr)
                 return
 
-            self.include_feature(feature_name, feature_meta)
+        # Next, import the libraries specified in the project specification
+        for mod_path in proj_yaml['Modules']['Features']:
+            self.load_feature_module(mod_path)
+
+        for mod_path in proj_yaml['Modules']['Hooks']:
+            self.load_hook_module(mod_path)
+
+        # Bucket the features by class, so that the documents already in the
+        # database can be fetched with one query per class rather than one
+        # round trip per feature.
+        feature_groups = {}
+        for feature_meta in proj_yaml['Features'].values():
+            feature_class = self._get_feature_class(feature_meta['class'])
+            feature_groups.setdefault(feature_class, []).append(feature_meta['id'])
+
+        # Resolve every hook named in the project once up front, rather than
+        # once for each feature that attaches it.
+        for feature_meta in proj_yaml['Features'].values():
+            for hook_type in Project.hook_types:
+                hook_meta = feature_meta.get(hook_type)
+                if hook_meta is not None:
+                    self._get_hook(hook_meta['name'])
+
+        existing = {}
+        for feature_class, feature_ids in feature_groups.items():
+            existing.update(
+                (feature.id, feature)
+                for feature in feature_class.objects(id__in=feature_ids)
+            )
+
+        # Finally, include the features.
+        for feature_name, feature_meta in proj_yaml['Features'].items():
+            self.include_feature(feature_name, feature_meta, existing)
 
-    @staticmethod
-    def __load_module(mod_path: str, search_path: List[str]):
+    def __listdir(self, dir_: str) -> Set[str]:
+        """Returns the names of the entries in a directory, listing each
+        directory only once per project load.
+        """
+        try:
+            return self._dir_cache[dir_]
+        except KeyError:
+            entries = set(os.listdir(dir_)) if os.path.isdir(dir_) else set()
+            self._dir_cache[dir_] = entries
+            return entries
+
+    def __load_module(self, mod_path: str, search_path: List[str]):
         # First expand the path, if it happens to contain e.g. a '~'
         mod_path = os.path.expanduser(mod_path)
 
@@ -67,7 +121,10 @@ class Project:
         if not os.path.isabs(mod_path):
             candidates = (os.path.join(dir_, mod_path) for dir_ in search_path)
             try:
-                mod_path = next(path for path in candidates if os.path.exists(path))
+                mod_path = next(
+                    path for path in candidates
+                    if os.path.basename(path) in self.__listdir(os.path.dirname(path))
+                )
             except:
                 raise ModuleNotFoundError(mod_path)
 
@@ -84,7 +141,7 @@ class Project:
         namespace
         """
         search_path = [os.path.dirname(self.path)]
-        module_name, mod = Project.__load_module(mod_path, search_path)
+        module_name, mod = self.__load_module(mod_path, search_path)
         self.feature_modules.update({module_name: mod})
 
     def load_hook_module(self, mod_path: str):
@@ -94,7 +151,7 @@ class Project:
         dysart_hook_dir = os.path.join(
             os.path.expanduser(conf.config['dys_path']), 'dysart', 'hooks')
         search_path = [os.path.dirname(self.path), dysart_hook_dir]
-        module_name, mod = Project.__load_module(mod_path, search_path)
+        module_name, mod = self.__load_module(mod_path, search_path)
         self.hook_modules.update({module_name: mod})
 
     def __validate_feature_yaml(self, feature_name: str, feature_meta: Dict):
@@ -150,7 +207,29 @@ class Project:
             item = getattr(item, name)
         return item
 
-    def include_feature(self, feature_name: str, feature_meta: Dict):
+    def _get_feature_class(self, feature_class_name: str) -> type:
+        """Returns the feature class with a given name, resolving it only the
+        first time it is requested.
+        """
+        try:
+            return self._feature_classes[feature_class_name]
+        except KeyError:
+            cls = self._feature_classes[feature_class_name] = \
+                self.resolve_feature_class(feature_class_name)
+            return cls
+
+    def _get_hook(self, hook_name: str) -> Callable:
+        """Returns the hook with a given name, resolving it only the first
+        time it is requested.
+        """
+        try:
+            return self._hooks[hook_name]
+        except KeyError:
+            fn = self._hooks[hook_name] = self.resolve_hook(hook_name)
+            return fn
+
+    def include_feature(self, feature_name: str, feature_meta: Dict,
+                        existing: Optional[Dict[str, me.Document]] = None):
         """Either load an existing document, if one exists, or create a new one and
         load it into this project.
 
@@ -164,6 +243,9 @@ class Project:
         Args:
             feature_name (str): The name of the feature to be included.
             feature_meta (Dict): The configuration metadata of the feature.
+            existing (Dict): Optionally, documents already fetched from the
+            database, indexed by ID. If this is passed, a feature missing
+            from it is assumed not to exist, and no query is issued.
 
         Returns:
             Feature of type feature_class.
@@ -177,7 +259,7 @@ class Project:
         # need to resolve the class name to an actual class that can be
         # instantiated.
         # TODO error handling: what to do if you don't get a class?
-        feature_class = self.resolve_feature_class(feature_meta['class'])
+        feature_class = self._get_feature_class(feature_meta['class'])
         # the database id of the feature
         feature_id = feature_meta['id']
         # get the key->id mapping of the feature's parents; default to empty dict
@@ -186,8 +268,15 @@ class Project:
         # TODO: it should also be easy to *update* parents just by editing
         # the .yaml
         try:
-            # Attempt to find this feature in the database
-            feature = feature_class.objects.get(id=feature_id)
+            # Attempt to find this feature among the prefetched documents, or
+            # failing that, in the database
+            if existing is not None:
+                try:
+                    feature = existing[feature_id]
+                except KeyError:
+                    raise me.DoesNotExist
+            else:
+                feature = feature_class.objects.get(id=feature_id)
         except me.DoesNotExist:
             # If it isn't found, create one!
             feature = feature_class(id=feature_id)
@@ -206,7 +295,7 @@ class Project:
             nonlocal feature
             hook_meta = feature_meta.get(hook_type, None)
             if hook_meta is not None:
-                fn = self.resolve_hook(hook_meta['name'])
+                fn = self._get_hook(hook_meta['name'])
                 args = hook_meta.get('args', [])
                 kwargs = hook_meta.get('kwargs', {})
                 if args or kwargs:
@@ -236,15 +325,14 @@ class Project:
         
         Returns: A list of tuples containing all the (parent, child)
         pairs in the graph, by feature name.
-
-        Todo:
-            This is a silly O(n^2) algorithm. It's a mild bother to do
-            an O(m) one, but rewrite if this becomes slow.
         """
+        # Parents are stored by id, so invert the name->id mapping once to
+        # visit each edge directly.
+        feature_names = {feature_id: name for name, feature_id in self.feature_ids.items()}
         edges = []
-        for child in self.feature_ids:
-            child_feature = self.features[self.feature_ids[child]]
-            for parent in self.feature_ids:
-                if self.feature_ids[parent] in child_feature.parent_ids.values():
-                    edges.append((parent, child))
+        for child, child_id in self.feature_ids.items():
+            parent_ids = self.features[child_id].parent_ids.values()
+            for parent_id in dict.fromkeys(parent_ids):
+                if parent_id in feature_names:
+                    edges.append((feature_names[parent_id], child))
         return edges
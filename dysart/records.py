@@ -1,10 +1,91 @@
+import atexit
 import datetime as dt
-import functools
 import hashlib
-import json
+import queue
+import sys
+import threading
+from typing import *
 
+from bson import ObjectId
 import mongoengine as me
 
+# orjson is considerably faster at parsing request bodies, but isn't required.
+try:
+    import orjson as json
+except ImportError:
+    import json
+
+# Request records are written to the database by a background thread, so that
+# handling a request never waits on an insert. When the queue backs up, the
+# writer drains it in batches of up to this many records.
+RECORD_BATCH_SIZE = 64
+# The most records that may wait to be written. If the database falls this far
+# behind, further records are dropped rather than held in memory.
+RECORD_QUEUE_SIZE = 16384
+
+_record_queue = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+_record_writer = None
+_record_writer_lock = threading.Lock()
+dropped_records = 0  # records dropped because the queue was full
+
+
+def _insert_records(batch: List["RequestRecord"]) -> None:
+    """Writes a batch of request records, reporting rather than raising any
+    failure, since losing a record shouldn't take down the writer.
+    """
+    try:
+        RequestRecord._get_collection().insert_many(
+            [record.to_mongo() for record in batch], ordered=False
+        )
+    except Exception as e:
+        print(f"Error: failed to persist request records: {e}", file=sys.stderr)
+
+
+def _write_records():
+    """Persists queued request records for the lifetime of the process.
+    """
+    while True:
+        batch = [_record_queue.get()]
+        while len(batch) < RECORD_BATCH_SIZE:
+            try:
+                batch.append(_record_queue.get_nowait())
+            except queue.Empty:
+                break
+        _insert_records(batch)
+
+
+def _flush_records():
+    """Writes whatever records are still queued. Run at exit, since the writer
+    is a daemon thread and won't get the chance.
+    """
+    batch = []
+    while True:
+        try:
+            batch.append(_record_queue.get_nowait())
+        except queue.Empty:
+            break
+        if len(batch) == RECORD_BATCH_SIZE:
+            _insert_records(batch)
+            batch = []
+    if batch:
+        _insert_records(batch)
+
+
+def _enqueue_record(record: "RequestRecord") -> None:
+    """Hands a record to the background writer, starting it if necessary.
+    """
+    global _record_writer, dropped_records
+    with _record_writer_lock:
+        if _record_writer is None:
+            _record_writer = threading.Thread(target=_write_records, daemon=True)
+            _record_writer.start()
+            atexit.register(_flush_records)
+    try:
+        _record_queue.put_nowait(record)
+    except queue.Full:
+        with _record_writer_lock:
+            dropped_records += 1
+
 
 class RequestRecord(me.Document):
     """An unwrapped API request, to be persisted.
@@ -21,21 +102,38 @@ class RequestRecord(me.Document):
     text = me.StringField(required=False)  # DictField can't handle much
     response = me.StringField(required=False)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, raw: bytes = b'', **kwargs):
         """
 
         Args:
-            request: An aiohttp request
+            raw: The undecoded request body, if it's at hand. It isn't
+            persisted, but saves a round trip through `text` when parsing.
         """
         super().__init__(*args, **kwargs)
-        self.time = dt.datetime.now()
-        self.__gen_uuid()
-        self.save()
+        self.raw = raw
+        # mongoengine also builds documents through here when loading them
+        # from the database; those already have all of this.
+        if self._created:
+            self.time = dt.datetime.now()
+            self.__gen_uuid()
+            # Assign the primary key now, rather than on insert, so that other
+            # documents can reference this one before it has been written.
+            self.id = ObjectId()
+
+    def persist(self) -> None:
+        """Queues a new record to be written to the database in the
+        background.
+        """
+        _enqueue_record(self)
 
     @property
-    @functools.lru_cache(1)
     def json(self):
-        return json.loads(self.text)
+        """The request body, parsed as JSON the first time it's asked for"""
+        try:
+            return self._json
+        except AttributeError:
+            self._json = json.loads(self.raw or self.text)
+            return self._json
 
     def __gen_uuid(self):
         """Creates a unique ID for the call record and assigned.
@@ -44,6 +142,10 @@ class RequestRecord(me.Document):
         from the standard library because we specifically want a pseudorandom
         string with non-predictable values even in the most significant digits
         """
-        h = hashlib.sha1(str(self.time).encode('utf-8'))
-        h.update(self.remote.encode('utf-8'))
-        self.uuid = h.hexdigest()[:RequestRecord.UUID_LEN]
+        # BLAKE2 is faster than SHA-1 in software, and can produce a digest
+        # of exactly the length we need.
+        h = hashlib.blake2b(self.time.isoformat().encode('ascii'),
+                            digest_size=RequestRecord.UUID_LEN // 2,
+                            person=b'dysart-uuid')
+        h.update(self.remote.encode('ascii'))
+        self.uuid = h.hexdigest()
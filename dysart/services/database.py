@@ -5,7 +5,6 @@ import re
 import signal
 import subprocess
 from typing import *
-from functools import lru_cache
 
 import toplevel.conf as conf
 from dysart.services.service import Service
@@ -13,18 +12,57 @@ from dysart.messages.errors import *
 
 import psutil
 
-def db_process() -> Optional[psutil.Process]:
-    """Tries to find a process running a mongodb server, locally This
-    implementation is probably unnecessarily slow. Could be slightly
-    more sophisticated to improve performance, if that matters.
+# The platform can't change under us, so only ask once.
+_SYSTEM = platform.system()
+_IS_POSIX = _SYSTEM in ('Darwin', 'Linux')
+
+
+def _scan_proc(name: str) -> Optional[int]:
+    """Finds the pid of a process whose command name contains `name` by
+    reading `/proc` directly, without building a psutil.Process for every
+    process on the system. Linux only.
+    """
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, 'comm'), 'r') as f:
+                    if name in f.read():
+                        return int(entry.name)
+            except OSError:
+                # The process exited while we were looking, or isn't ours to read.
+                continue
+    return None
 
 
+def _is_mongod(pid: int) -> bool:
+    """Checks that a pid belongs to a running mongod, rather than, e.g., to
+    another process that has since been given the pid of one that exited.
+    """
+    try:
+        return 'mongod' in psutil.Process(pid).name()
+    except psutil.Error:
+        return False
+
+
+def db_process() -> Optional[psutil.Process]:
+    """Tries to find a process running a mongodb server, locally.
+
     Returns: a mongodb database process
 
     """
-    processes = psutil.process_iter()
-    for process in processes:
-        if 'mongod' in process.name():  # TODO
+    if _SYSTEM == 'Linux':
+        pid = _scan_proc('mongod')
+        if pid is None:
+            return None
+        try:
+            return psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            # It exited since the scan
+            return None
+    for process in psutil.process_iter(['name']):
+        if 'mongod' in (process.info['name'] or ''):  # TODO
             return process
     return None
 
@@ -48,6 +86,13 @@ class Database(Service):
 
     def __init__(self):
         self.proc_output = None  # what does this do?
+        # The configuration doesn't change under a running service, so the
+        # paths derived from it only need to be built once.
+        db_root = os.path.join(conf.dys_path, conf.config['default_db'])
+        self._db_dir = os.path.join(db_root, 'db')
+        self._log_dir = os.path.join(db_root, 'log')
+        self._pid_path = os.path.join(db_root, 'mongod.pid')
+        self._log_day = None
         # ensure that necessary database directories exist
         for dir in (os.path.split(self.log_path)[0], self.db_dir):
             if not os.path.exists(dir):
@@ -61,41 +106,47 @@ class Database(Service):
     def port(self) -> Optional[int]:
         """Optionally returns a port number of a running process; none if not running.
         """
-        # TODO really do clean up this fragile method. Abstract away some of the repetition
-        # between platforms; if possible remove the dependency on `netstat`, etc.
-        system = platform.system()
-        if system in 'Linux, Darwin':
-            p = psutil.Process(self.pid)
-            return p.connections()[0].laddr.port  # TODO can this fail?
-        if system == 'Windows':
-            # TODO
-            #  * any reasonable error handling at all
-            #  * relies on specific output behavior of netstat (which might change)
-            #  * possibly works accidentally?
-            #  * How does this look for mongodb processes, specifically?
-            #  * Why did I do this in this way in the first place? Does psutil not work?
-            try:
-                netstat_output = subprocess.run(
-                    f"netstat -ano".split(),
-                    capture_output=True
-                )
-                splits = (line.split() for line in netstat_output.stdout.decode().splitlines()
-                          if line.lstrip().startswith('TCP'))
-                # NOTE question: What's the difference between field 1 and field 2 in `line`?
-                matching_addrs = [line[1] for line in splits if line[4] == str(self.pid)]
-                ports = [int(addr.split(':')[1]) for addr in matching_addrs]
-                # Is the first nonzero port the right thing to return here?
-                return next(port for port in ports if port != 0)
-            except Exception as e:
-                # TODO bad: pokemon exception handling
-                return None
-
-    # I'd rather use cached_property, but a lot of the lab is still on 3.7.
+        if self.pid is None:
+            return None
+        try:
+            return next(conn.laddr.port for conn in
+                        psutil.Process(self.pid).connections(kind='tcp')
+                        if conn.status == psutil.CONN_LISTEN)
+        except psutil.NoSuchProcess:
+            # The cached pid is stale; mongod has exited
+            self._forget_pid()
+            return None
+        except (psutil.Error, StopIteration):
+            # e.g. AccessDenied, or not listening yet
+            return None
+
+    # The value is cached on the instance, and dropped by _start and _stop.
+    # mongod may also exit or be restarted behind our back, so a cached pid
+    # is checked again on each use.
     @property
-    @lru_cache(maxsize=1)
     def pid(self) -> Optional[int]:
         """Returns the process id of the running mongod instance, if there is
-        one. This """
+        one. This is read from the pidfile that mongod writes when started by
+        this service; only if it doesn't name a live mongod do we fall back
+        to scanning the process table, e.g. for a server started by hand.
+        """
+        try:
+            pid = self._pid
+        except AttributeError:
+            pid = self._pid = self._find_pid()
+        else:
+            if pid is not None and not _is_mongod(pid):
+                pid = self._pid = self._find_pid()
+        return pid
+
+    def _find_pid(self) -> Optional[int]:
+        try:
+            with open(self.pid_path, 'r') as f:
+                pid = int(f.read().strip())
+            if _is_mongod(pid):
+                return pid
+        except (OSError, ValueError):
+            pass
         process = db_process()
         if process is not None:
             return process.pid
@@ -103,13 +154,15 @@ class Database(Service):
             return None
 
     def _start(self) -> None:
-        if platform.system() in ('Darwin', 'Linux'):
+        if _IS_POSIX:
             command = f"""mongod --port {conf.config["db_port"]} --fork --quiet
             --logappend --logpath {self.log_path} --dbpath {self.db_dir}
+            --pidfilepath {self.pid_path}
             """.split()
             self.completed_proc = subprocess.run(command, capture_output=True)
+            self._forget_pid()
 
-        elif platform.system() == 'Windows':
+        elif _SYSTEM == 'Windows':
             # On Widows, currently rely on service being started externally.
             # There seem to be conflicting requirements here: the blessed way
             # to run this on NT is as a Windows Service, but this can only be
@@ -119,34 +172,39 @@ class Database(Service):
                 raise ServiceNotFoundError
 
     def _stop(self) -> None:
-        if platform.system() in ('Darwin', 'Linux'):
+        if _IS_POSIX:
             os.kill(self.pid, signal.SIGINT)
-        elif platform.system() == 'Windows':
+            self._forget_pid()
+        elif _SYSTEM == 'Windows':
             raise NotImplementedError
 
+    def _forget_pid(self) -> None:
+        """Drops the cached pid, e.g. when the process has changed"""
+        self.__dict__.pop('_pid', None)
+
     @property
     def db_dir(self) -> str:
         # TODO it might actually be a little confusing that this is a property
-        return os.path.join(
-            conf.dys_path,
-            conf.config['default_db'],
-            'db'
-        )
+        return self._db_dir
+
+    @property
+    def pid_path(self) -> str:
+        """Returns the path of the pidfile written by a mongod we start"""
+        return self._pid_path
 
     @property
     def log_dir(self) -> str:
         # TODO it might actually be a little confusing that this is a property
-        return os.path.join(
-            conf.dys_path,
-            conf.config['default_db'],
-            'log'
-        )
+        return self._log_dir
 
     @property
     def log_path(self) -> str:
         """Returns the full path of the current logfile"""
         # TODO it might actually be a little confusing that this is a property
-        now = datetime.datetime.now()
-        base = 'mongod_{}{}{}.log'.format(now.year, now.month, now.day)
-        return os.path.join(self.log_dir, str(now.year),
-                            str(now.month), base)
+        today = datetime.date.today()
+        if today != self._log_day:
+            base = 'mongod_{}{}{}.log'.format(today.year, today.month, today.day)
+            self._log_path = os.path.join(self.log_dir, str(today.year),
+                                          str(today.month), base)
+            self._log_day = today
+        return self._log_path
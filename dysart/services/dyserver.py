@@ -12,16 +12,25 @@ TODO
   job queue to a backup file on the database, and recover from this on startup.
 """
 
-import base64
+import asyncio
+import binascii
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import hashlib
-from io import StringIO
+import hmac
+import io
 import json
+import logging
+import math
 import os
 import pickle
+import struct
 import sys
+import tempfile
+import threading
+from typing import *
 
-from dysart.feature import exposed, CallRecord
+from dysart.feature import exposed, refresh_names, CallRecord, save_call_records
 from dysart.records import RequestRecord
 import dysart.messages.messages as messages
 import dysart.messages.errors as errors
@@ -33,33 +42,177 @@ import toplevel.conf as conf
 import aiohttp.web as web
 import mongoengine as me
 
+logger = logging.getLogger(__name__)
+
+# uvloop is a faster drop-in event loop, if it's installed.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# pybase64 has a vectorized decoder; the standard library's is fine otherwise.
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+
+# zstandard lets large responses be compressed, for clients that accept it.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# orjson serializes straight to bytes, and is much faster on the large numeric
+# payloads that feature results tend to be, but isn't required.
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(
+            obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# Protocol 5 frames large buffers (e.g. numpy arrays) without extra copies.
+# Unpickling it needs Python 3.8 on the client.
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+
+# Pickled responses larger than this many bytes are spooled to disk, rather
+# than held in memory, while they're sent. They're sent in chunks of this size.
+SPOOL_MAX_SIZE = 1 << 20
+RESPONSE_CHUNK_SIZE = 1 << 16
+
+# Responses smaller than this many bytes aren't worth compressing
+COMPRESS_MIN_SIZE = 4096
+ZSTD_LEVEL = 3
+
+
+def accepts_zstd(request: web.Request) -> bool:
+    """Checks whether a response to a request may be compressed with zstd"""
+    return (zstandard is not None
+            and 'zstd' in request.headers.get('Accept-Encoding', ''))
+
+
+def compress(body: bytes) -> Optional[bytes]:
+    """Compresses a response body with zstd, or returns None if it's too small
+    to be worth it or zstd isn't available.
+    """
+    if zstandard is None or len(body) < COMPRESS_MIN_SIZE:
+        return None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+def json_response(request: web.Request, body: bytes,
+                  compressed: Optional[bytes] = None) -> web.Response:
+    """Makes a response from a serialized JSON body, compressing it if it's
+    large and the client accepts zstd. A body that is sent over and over can
+    be compressed once, with `compress`, and passed as `compressed`.
+    """
+    headers = {}
+    if len(body) >= COMPRESS_MIN_SIZE and accepts_zstd(request):
+        body = compressed if compressed is not None else compress(body)
+        headers['Content-Encoding'] = 'zstd'
+    return web.Response(body=body, content_type='application/json',
+                        headers=headers)
+
+
+# The content type of a pickle sent with its large buffers out-of-band. The
+# body starts with a header of little-endian integers: the number of buffers
+# (4 bytes), then the length of the pickle and of each buffer (8 bytes each).
+# Then come the pickle itself, and the buffers in order.
+PICKLE_OOB_CONTENT_TYPE = 'application/x-dysart-pickle-oob'
+
 
-def process_request(coro):
-    """Wraps a session handler coroutine to perform authentication; also
-    injects internal request type.
+def is_small_json(obj, limit: int = 256) -> bool:
+    """Checks whether an object is small, and built only of types that JSON
+    represents exactly, so that a client decoding it gets back what was sent.
+    Tuples, non-string keys and non-finite floats, for instance, don't survive.
 
     Args:
-        coro: A coroutine function, notionally an HTTP request handler.
+        obj: the object to check
+        limit: the most values the object may contain
+    """
+    stack = [obj]
+    count = 0
+    while stack:
+        item = stack.pop()
+        count += 1
+        if count > limit:
+            return False
+        t = type(item)
+        if t in (str, int, bool, type(None)):
+            continue
+        if t is float:
+            if not math.isfinite(item):
+                return False
+        elif t is list:
+            stack.extend(item)
+        elif t is dict:
+            if any(type(key) is not str for key in item):
+                return False
+            stack.extend(item.values())
+        else:
+            return False
+    return True
 
-    Returns:
-        A coroutine function, notionally an HTTP request handler.
 
-    Todo:
-        Need to figure out how to unwrap the response to persist its body
-        in the RequestRecord
+def pickle_to_spool(obj) -> Tuple[tempfile.SpooledTemporaryFile, int, List[memoryview]]:
+    """Pickles an object into a spooled temporary file, so that a large
+    one needn't be held in memory in its entirety. Buffers that support it
+    (e.g. those of numpy arrays) are left out of the pickle, to be sent
+    separately without being copied.
 
+    Returns: the file, rewound, the size of its contents, and the
+    out-of-band buffers.
     """
-    @functools.wraps(coro)
-    async def wrapped(self, request):
-        await self.authorize(request)
-        text = await request.text()
-        request = RequestRecord(
-            remote=request.remote,
-            path=request.path,
-            text=text
-        )
-        return await coro(self, request)
-    return wrapped
+    buf = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    buffers = []
+    if PICKLE_PROTOCOL >= 5:
+        pickler = pickle.Pickler(buf, protocol=PICKLE_PROTOCOL,
+                                 buffer_callback=buffers.append)
+    else:
+        pickler = pickle.Pickler(buf, protocol=PICKLE_PROTOCOL)
+    pickler.dump(obj)
+    size = buf.tell()
+    buf.seek(0)
+    return buf, size, [buffer.raw() for buffer in buffers]
+
+
+@functools.lru_cache(maxsize=64)
+def parse_authorization(authorization: str) -> Tuple[str, bytes]:
+    """Decodes a basic-auth header into a username and the digest of its
+    token. Clients send the same header with every request, so the results
+    are memoized.
+
+    Raises:
+        web.HTTPUnauthorized: if the header isn't well-formed basic auth
+    """
+    # Split each field once at its first separator; RFC 7617 allows
+    # colons in the password.
+    atype, _, credentials = authorization.partition(' ')
+    if atype.lower() != 'basic':
+        raise web.HTTPUnauthorized
+    try:
+        decoded = b64decode(credentials, validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise web.HTTPUnauthorized
+    user, sep, token = decoded.partition(':')
+    if not sep:
+        raise web.HTTPUnauthorized
+    return user, Dyserver.hashpass(token)
+
+
+def project_version(project_path: str) -> Optional[Tuple[int, int]]:
+    """Identifies the current version of a project file by its modification
+    time and size, or returns None if it can't be read.
+    """
+    try:
+        stat = os.stat(os.path.expanduser(project_path))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
 
 class Dyserver(service.Service):
@@ -69,11 +222,16 @@ class Dyserver(service.Service):
         """
         self.host = conf.config['server_host']
         self.port = int(conf.config['server_port'])
+        self.max_inflight = int(conf.config.get('server_max_inflight', 256))
+        self.backlog = int(conf.config.get('server_backlog', 2048))
+        self.keepalive_timeout = float(conf.config.get('server_keepalive_timeout', 75))
+        self.max_refresh_concurrency = int(conf.config.get('max_refresh_concurrency', 4))
         self.labber_host = conf.config['labber_host']
         self.logfile = os.path.join(
             conf.dys_path,
             conf.config['logfile_name']
         )
+        messages.configure_logging(self.logfile)
 
         # start_db option: run the database server as a subprocess
         # on startup!
@@ -89,7 +247,43 @@ class Dyserver(service.Service):
             self.db_host = conf.config['db_host']
             self.db_port = conf.config['db_port']
 
-        self.app = web.Application()
+        # Authorized token hashes are stored as hex in the configuration;
+        # keep them as raw digests so that checking a request doesn't need
+        # to hex-encode anything.
+        self.token_digests = frozenset(
+            bytes.fromhex(token_hash) for token_hash in conf.config['tokens'] or ()
+        )
+
+        # Serialized GET responses and their ETags, indexed by feature ID. An
+        # entry is dropped whenever something happens that could change the
+        # feature.
+        self._get_cache = {}
+        # How many times each feature's entry has been invalidated, and how
+        # many times the whole cache has been. A response computed while
+        # either changed is out of date, and mustn't be cached.
+        self._get_generations = {}
+        self._get_epoch = 0
+
+        # Exposed methods of the loaded project, indexed by (feature name,
+        # method name). Built once per project load.
+        self._dispatch = {}
+        # Features of the loaded project, indexed by name
+        self._features_by_name = {}
+
+        # The path and file version of the loaded project, and the serialized
+        # response describing it, as is and compressed
+        self._project_body = (None, None, None, None)
+
+        # Feature methods and serialization can take a while, and are run
+        # here so as not to hold up the event loop. They mostly wait on
+        # instruments and the database, so this needn't match the CPU count.
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(conf.config.get('worker_threads', 8))
+        )
+
+        self.app = web.Application(
+            middlewares=[self.limit_inflight, self.record_request]
+        )
         self.setup_routes()
 
     # TODO marked for deletion
@@ -98,32 +292,106 @@ class Dyserver(service.Service):
 
     def _start(self) -> None:
         """Connects to services and runs the server continuously"""
-        self.db_connect(self.db_host, self.db_port)
-        self.labber_connect(self.labber_host)
-        web.run_app(self.app, host=self.host, port=self.port)
+        self.connect()
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
         if hasattr(self, 'db_server'):
             self.db_server.stop()
 
+    async def serve(self) -> None:
+        """Runs the web application until cancelled."""
+        # The semaphores have to be made inside the loop that will use them.
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self._refresh_slots = asyncio.Semaphore(self.max_refresh_concurrency)
+        # Formatting an access log line for every request is expensive, so
+        # only do it with the `access_log` option.
+        runner_args = {'keepalive_timeout': self.keepalive_timeout}
+        if 'access_log' not in conf.config['options']:
+            runner_args['access_log'] = None
+        runner = web.AppRunner(self.app, **runner_args)
+        await runner.setup()
+        try:
+            site = web.TCPSite(runner, self.host, self.port, backlog=self.backlog)
+            await site.start()
+            print(f"Serving on http://{self.host}:{self.port}")
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    @web.middleware
+    async def limit_inflight(self, request: web.Request, handler):
+        """Turns requests away once too many are being handled at once,
+        rather than letting them all pile up on the event loop.
+        """
+        if self._inflight.locked():
+            raise web.HTTPServiceUnavailable(reason="Server is busy")
+        async with self._inflight:
+            return await handler(request)
+
+    @web.middleware
+    async def record_request(self, request: web.Request, handler):
+        """Authenticates an incoming request and records it, before passing
+        it on to its handler. The record is available to the handler as
+        `request['record']`.
+
+        Todo:
+            Need to figure out how to unwrap the response to persist its body
+            in the RequestRecord
+        """
+        await self.authorize(request)
+        raw = await request.read() if request.can_read_body else b''
+        record = RequestRecord(
+            remote=request.remote,
+            path=request.path,
+            text=raw.decode('utf-8'),
+            raw=raw
+        )
+        record.persist()
+        request['record'] = record
+        return await handler(request)
+
     def _stop(self) -> None:
         """Ends the server process"""
         if hasattr(self, 'db_server'):
             self.db_server.stop()
 
+    def connect(self) -> None:
+        """Connects to the database and then the instrument server. These are
+        done one after the other: connecting to Labber swaps out the
+        process-wide standard streams to sniff its errors, which would
+        swallow or misattribute output from anything running alongside it.
+        """
+        self.db_connect(self.db_host, self.db_port)
+        self.labber_connect(self.labber_host)
+
     def db_connect(self, host=None, port=None) -> None:
         """Sets up database client for python interpreter.
         """
         with messages.StatusMessage('{}connecting to database...'.format(messages.TAB)):
             try:
                 #Added support for database authentication with users
+                # Size the connection pool explicitly: the handlers share
+                # this one client, and an unbounded pool under load just
+                # moves the queueing onto the database server.
                 self.db_client = me.connect(conf.config['default_db'],
                                             host=host,
                                             port=port,
                                             username=conf.config['user_name'],
                                             password=conf.config['password'],
-                                            authentication_source=conf.config['auth_db'])
-                # Do the following lines do anything? I actually don't know.
-                sys.path.pop(0)
-                sys.path.insert(0, os.getcwd())
+                                            authentication_source=conf.config['auth_db'],
+                                            maxPoolSize=int(conf.config.get('db_max_pool_size', 32)),
+                                            minPoolSize=int(conf.config.get('db_min_pool_size', 4)),
+                                            waitQueueTimeoutMS=int(conf.config.get('db_wait_queue_timeout_ms', 2000)),
+                                            maxIdleTimeMS=int(conf.config.get('db_max_idle_time_ms', 60000)),
+                                            serverSelectionTimeoutMS=int(conf.config.get('db_server_selection_timeout_ms', 5000)))
+                # The client connects lazily; make it do so now, so that the
+                # first request doesn't pay for it. pymongo then fills the
+                # pool up to minPoolSize in the background.
+                self.db_client.admin.command('ping')
             except Exception as e:  # TODO
                 self.db_client = None
                 raise ConnectionError
@@ -148,11 +416,37 @@ class Dyserver(service.Service):
         existed.
         """
         self.project = project.Project(project_path)
+        self._invalidate()
+        self._features_by_name = {
+            sys.intern(name): self.project.features[feature_id]
+            for name, feature_id in self.project.feature_ids.items()
+        }
+        # Whether a method needs a refresh is a property of the feature's
+        # class, so it's settled here rather than looked up on each call.
+        self._dispatch = {}
+        for name, feature_id in self.project.feature_ids.items():
+            feature = self.project.features[feature_id]
+            refreshes = refresh_names(type(feature))
+            for method in feature.exposed_methods():
+                key = sys.intern(name), sys.intern(method.__name__)
+                self._dispatch[key] = (feature_id, method,
+                                       method.__name__ in refreshes)
+
+        # The project description sent to clients doesn't change until the
+        # next load, so serialize and compress it once here.
+        features = {name: [] for name in self.project.feature_ids}
+        for name, method_name in self._dispatch:
+            features[name].append(method_name)
+        body = _dumps({
+            'graph': self.project.feature_graph(),
+            'features': features,
+        })
+        self._project_body = (project_path, project_version(project_path),
+                              body, compress(body))
 
     @staticmethod
-    def hashpass(token: str) -> str:
-        h = hashlib.sha1(token.encode('utf-8'))
-        return h.hexdigest()
+    def hashpass(token: str) -> bytes:
+        return hashlib.sha1(token.encode('utf-8')).digest()
 
     async def authorize(self, request: web.Request):
         """Auth for an incoming HTTP request. In the future this will probably
@@ -170,34 +464,69 @@ class Dyserver(service.Service):
             authorization = request.headers['authorization']
         except KeyError:
             raise web.HTTPForbidden
-        atype, credentials = authorization.split()
-        user, token = base64.b64decode(credentials).decode('utf-8').split(':')
-        if Dyserver.hashpass(token) not in conf.config['tokens']:
+        user, digest = parse_authorization(authorization)
+        # Compare against every token, in constant time, so that how long
+        # this takes says nothing about how close the guess was.
+        authorized = False
+        for token_digest in self.token_digests:
+            authorized |= hmac.compare_digest(digest, token_digest)
+        if not authorized:
             raise web.HTTPUnauthorized
 
-    async def refresh_feature(self, feature, request: RequestRecord):
-        """
+    async def refresh_feature(self, feature, record: RequestRecord):
+        """Refreshes a feature's expired ancestors. Features that don't
+        depend on one another are refreshed concurrently, one level of the
+        dependency graph at a time.
 
         Args:
             feature: the feature to be refreshed
+            record: the request that prompted the refresh
+        """
+        loop = asyncio.get_running_loop()
+        levels = await feature.expired_levels()
+        for level in levels:
+            call_records = [CallRecord(scheduled_feature, record)
+                            for scheduled_feature in level]
+            results = await asyncio.gather(
+                *(self._exec_scheduled(scheduled_feature, call_record)
+                  for scheduled_feature, call_record in zip(level, call_records)),
+                return_exceptions=True
+            )
+            # Write the level's call records all at once, whether or not the
+            # calls succeeded.
+            await loop.run_in_executor(self._executor, save_call_records, call_records)
+            for result in results:
+                if isinstance(result, errors.InstrumentNotFoundError):
+                    raise web.HTTPNotImplemented(reason=f"Instrument not found: {result}")
+                if isinstance(result, BaseException):
+                    raise result
+
+    async def _exec_scheduled(self, feature, call_record: CallRecord):
+        """Executes one of the features scheduled by `refresh_feature`. At
+        most `max_refresh_concurrency` of these run at once, across all
+        requests, so as not to swamp the instruments.
+        """
+        async with self._refresh_slots:
+            await feature.exec_feature(call_record)
+        self._invalidate(feature.id)
 
-        Todo:
-            Schedule causally-independent features to be refreshed
-            concurrently. This should just execute them serially.
-            At some point in the near future, I'd like to implement
-            a nice concurrent graph algorithm that lets the server
-            keep multiple refreshes in flight at once.
+    def _invalidate(self, feature_id: Optional[str] = None) -> None:
+        """Drops the cached GET response of a feature, or of every feature if
+        none is given.
         """
-        scheduled_features = await feature.expired_ancestors()
-        try:
-            for scheduled_feature in scheduled_features:
-                record = CallRecord(scheduled_feature, request)
-                await scheduled_feature.exec_feature(record)
-        except errors.InstrumentNotFoundError as e:
-            raise web.HTTPNotImplemented(reason=f"Instrument not found: {e}")
-
-    @process_request
-    async def feature_get_handler(self, request: RequestRecord):
+        if feature_id is None:
+            self._get_cache.clear()
+            self._get_epoch += 1
+        else:
+            self._get_cache.pop(feature_id, None)
+            self._get_generations[feature_id] = \
+                self._get_generations.get(feature_id, 0) + 1
+
+    def _get_generation(self, feature_id: str) -> Tuple[int, int]:
+        """Identifies the current state of a feature's cache entry"""
+        return self._get_epoch, self._get_generations.get(feature_id, 0)
+
+    async def feature_get_handler(self, request: web.Request):
         """Handles requests that only retrieve data about Features.
         For now, it simply retrieves the values of all `refresh`
         methods attached to the Feature.
@@ -217,21 +546,38 @@ class Dyserver(service.Service):
         }
 
         """
-        data = request.json
-        try:
-            feature_id = self.project.feature_ids[data['feature']]
-            feature = self.project.features[feature_id]
-        except KeyError:
+        record = request['record']
+        data = record.json
+        name = data['feature']
+        feature = self._features_by_name.get(name) if isinstance(name, str) else None
+        if feature is None:
             raise web.HTTPNotFound(
                 reason=f"Feature {data['feature']} not found"
             )
+        feature_id = feature.id
 
-        response_data = feature._repr_dict_()
-        response_data['name'] = data['feature']
-        return web.Response(body=json.dumps(response_data))
-
-    @process_request
-    async def feature_post_handler(self, request: RequestRecord):
+        try:
+            etag, body = self._get_cache[feature_id]
+        except KeyError:
+            generation = self._get_generation(feature_id)
+            # Computing the results may block on fits and database writes, so
+            # keep it off the event loop.
+            response_data, = await self._call_feature(feature, feature._repr_dict_)
+            response_data['name'] = data['feature']
+            body = _dumps(response_data)
+            etag = '"{}"'.format(hashlib.blake2b(body, digest_size=8).hexdigest())
+            # If the feature changed in the meantime, this response may
+            # already be stale; send it, but don't keep it.
+            if self._get_generation(feature_id) == generation:
+                self._get_cache[feature_id] = (etag, body)
+
+        headers = {'ETag': etag, 'Cache-Control': 'private, max-age=1'}
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type='application/json',
+                            headers=headers)
+
+    async def feature_post_handler(self, request: web.Request):
         """Handles requests that may mutate state.
 
         Args:
@@ -241,35 +587,180 @@ class Dyserver(service.Service):
         Returns:
 
         """
-        data = request.json
-        # Rolling my own remote object protocol...
-        try:
-            feature_id = self.project.feature_ids[data['feature']]
-            feature = self.project.features[feature_id]
-        except KeyError:
-            raise web.HTTPNotFound(
-                reason=f"Feature {data['feature']} not found"
+        record = request['record']
+        data = record.json
+        feature_id, method, is_refresh = self._resolve_call(data)
+
+        if is_refresh:
+            await self.refresh_feature(self.project.features[feature_id], record)
+
+        # Logged lazily, rather than printed: this runs on every call.
+        logger.debug("Calling method `%s` of feature `%s`", data['method'], data['feature'])
+        return_value, = await self._call_feature(
+            self.project.features[feature_id],
+            functools.partial(method, *data['args'], **data['kwargs'])
+        )
+        # Exposed methods may mutate the feature
+        self._invalidate(feature_id)
+        return await self._send_value(request, return_value)
+
+    async def feature_batch_post_handler(self, request: web.Request):
+        """Handles several feature method calls in one request, so that a
+        client polling many features pays for only one round trip. After any
+        refreshes they need, calls on different features are issued
+        concurrently; calls on the same feature run one at a time, in order.
+
+        Args:
+            request: request data is expected to have the fields `project`
+            and `calls`, a list of objects with the fields `feature`,
+            `method`, `args`, and `kwargs`.
+
+        Returns: A list of the calls' return values, in order.
+
+        """
+        record = request['record']
+        calls = record.json['calls']
+        resolved = [self._resolve_call(call) for call in calls]
+
+        # Refresh each feature at most once, however many calls it gets.
+        to_refresh = {feature_id for feature_id, _, is_refresh in resolved
+                      if is_refresh}
+        for feature_id in to_refresh:
+            await self.refresh_feature(self.project.features[feature_id], record)
+
+        # The calls on each feature, with their positions in the batch
+        by_feature = {}
+        for i, ((feature_id, method, _), call) in enumerate(zip(resolved, calls)):
+            by_feature.setdefault(feature_id, []).append(
+                (i, functools.partial(method, *call['args'], **call['kwargs']))
             )
+        feature_values = await asyncio.gather(*(
+            self._call_feature(self.project.features[feature_id],
+                               *(fn for _, fn in feature_calls))
+            for feature_id, feature_calls in by_feature.items()
+        ))
+        return_values = [None] * len(calls)
+        for feature_calls, values in zip(by_feature.values(), feature_values):
+            for (i, _), value in zip(feature_calls, values):
+                return_values[i] = value
+        for feature_id in by_feature:
+            self._invalidate(feature_id)
+        return await self._send_value(request, return_values)
+
+    async def _call_feature(self, feature, *fns: Callable) -> List[Any]:
+        """Calls functions that use a feature on a worker thread, one after
+        the other, while holding the feature's lock.
+
+        Returns: the functions' return values, in order
+        """
+        def call():
+            with feature.call_lock:
+                return [fn() for fn in fns]
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+    def _resolve_call(self, call: Dict) -> Tuple[str, exposed, bool]:
+        """Finds the exposed method named by a remote call.
+
+        Args:
+            call: an object with the fields `feature` and `method`
+
+        Returns: the ID of the feature, its bound method, and whether the
+        feature must be refreshed before the method is called
+
+        Raises:
+            web.HTTPNotFound: if there is no such feature or method, *or* if
+            the method is unexposed.
 
-        method = getattr(feature, data['method'], None)
-        if not isinstance(method, exposed):
-            # This exception will be raised if there is no such method *or* if
-            # the method is unexposed.
+        """
+        # Rolling my own remote object protocol...
+        feature_name, method_name = call['feature'], call['method']
+        try:
+            return self._dispatch[feature_name, method_name]
+        except (KeyError, TypeError):
+            # A TypeError means a name wasn't even hashable, e.g. a list
+            pass
+        if not (isinstance(feature_name, str)
+                and feature_name in self._features_by_name):
             raise web.HTTPNotFound(
-                reason=f"Feature {data['feature']} has no method {data['method']}"
+                reason=f"Feature {feature_name} not found"
             )
+        raise web.HTTPNotFound(
+            reason=f"Feature {feature_name} has no method {method_name}"
+        )
 
-        if hasattr(method, 'is_refresh'):
-            await self.refresh_feature(feature, request)
-
-        print(f"Calling method `{data['method']}` of feature `{data['feature']}`")
-        return_value = method(*data['args'], **data['kwargs'])
-        return web.Response(body=pickle.dumps(return_value))
+    async def _send_value(self, request: web.Request, value) -> web.StreamResponse:
+        """Responds to a request with a value returned by feature methods,
+        as JSON if that's exact, or else as a pickle.
+        """
+        loop = asyncio.get_running_loop()
+        # Most return values are small and plain; send those as JSON, which is
+        # cheaper to produce and to read than a pickle.
+        if is_small_json(value):
+            try:
+                return json_response(request, _dumps(value))
+            except (TypeError, ValueError):
+                # e.g. an integer too large for orjson
+                pass
+        buf, size, buffers = await loop.run_in_executor(
+            self._executor, pickle_to_spool, value
+        )
+        with buf:
+            response = web.StreamResponse()
+            if buffers:
+                lengths = [buffer.nbytes for buffer in buffers]
+                header = struct.pack(f'<I{len(buffers) + 1}Q',
+                                     len(buffers), size, *lengths)
+                response.content_type = PICKLE_OOB_CONTENT_TYPE
+            else:
+                lengths = []
+                header = b''
+                response.content_type = 'application/octet-stream'
+            content_length = len(header) + size + sum(lengths)
+
+            # Large results are compressed as they're sent, if the client
+            # accepts it. The compressed length isn't known up front, so
+            # then the body is sent chunked.
+            compressor = None
+            if content_length >= COMPRESS_MIN_SIZE and accepts_zstd(request):
+                compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+                response.headers['Content-Encoding'] = 'zstd'
+            else:
+                response.content_length = content_length
+
+            async def send(chunk):
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    await response.write(chunk)
+
+            await response.prepare(request)
+            await send(header)
+            # A pickle larger than the spool has rolled over to disk, and
+            # reading it could hold up the event loop.
+            read = functools.partial(buf.read, RESPONSE_CHUNK_SIZE)
+            on_disk = size > SPOOL_MAX_SIZE
+            while True:
+                if on_disk:
+                    chunk = await loop.run_in_executor(self._executor, read)
+                else:
+                    chunk = read()
+                if not chunk:
+                    break
+                await send(chunk)
+        for buffer in buffers:
+            for start in range(0, buffer.nbytes, RESPONSE_CHUNK_SIZE):
+                await send(buffer[start:start + RESPONSE_CHUNK_SIZE])
+        if compressor is not None:
+            await response.write(compressor.flush())
+        await response.write_eof()
+        return response
 
-    @process_request
-    async def project_post_handler(self, request: RequestRecord):
+    async def project_post_handler(self, request: web.Request):
         """Handles project management-related requests. For now,
-        this just loads/reloads the sole project in server memory.
+        this just loads the sole project in server memory, reloading it if
+        its project file has changed.
 
         Args:
             request: request data is expected to have the field,
@@ -278,33 +769,37 @@ class Dyserver(service.Service):
         Returns:
 
         """
-        data = request.json
+        return await self._post_project(request, reload=False)
+
+    async def project_reload_handler(self, request: web.Request):
+        """Like `project_post_handler`, but always reloads the project, e.g.
+        to pick up changes to its feature modules.
+        """
+        return await self._post_project(request, reload=True)
 
-        def exposed_method_names(feature_id: str):
-            return [m.__name__ for m in
-                    self.project.features[feature_id].exposed_methods()]
+    async def _post_project(self, request: web.Request, reload: bool):
+        record = request['record']
+        data = record.json
 
         try:
-            print(f"Loading project `{data['project']}`")
-            self.load_project(conf.config['projects'][data['project']])
-            proj = self.project
-            graph = proj.feature_graph()
-            body = {
-                'graph': graph,
-                'features': {
-                    name: exposed_method_names(feature_id)
-                    for name, feature_id in proj.feature_ids.items()
-                }
-            }
-            response = web.Response(body=json.dumps(body))
+            project_path = conf.config['projects'][data['project']]
         except KeyError:
-            response = web.HTTPNotFound(
+            return web.HTTPNotFound(
                 reason=f"Project {data['project']} not found"
             )
+
+        # Only reload the project if it isn't already loaded, or if its
+        # project file has changed since it was.
+        loaded_path, loaded_version, body, compressed = self._project_body
+        if (reload or loaded_path != project_path
+                or loaded_version != project_version(project_path)):
+            print(f"Loading project `{data['project']}`")
+            self.load_project(project_path)
+            _, _, body, compressed = self._project_body
+        response = json_response(request, body, compressed)
         return response
 
-    @process_request
-    async def debug_handler(self, request: RequestRecord):
+    async def debug_handler(self, request: web.Request):
         """A handler invoked by a client-side request to transfer control
         of the server process to a debugger. This feature should be disabled
         without admin authentication
@@ -320,25 +815,84 @@ class Dyserver(service.Service):
         pass  # A reminder that nothing is supposed to happen
         return web.Response()
 
+    async def debug_pool_handler(self, request: web.Request):
+        """Reports on the database client's connection pool.
+
+        Returns: A json object with the format,
+        {
+            'nodes': [host:port, ...],
+            'max_pool_size': max_pool_size,
+            'min_pool_size': min_pool_size,
+            'wait_queue_timeout': wait_queue_timeout,
+            'max_idle_time': max_idle_time,
+        }
+
+        """
+        if getattr(self, 'db_client', None) is None:
+            raise web.HTTPServiceUnavailable(reason="Not connected to database")
+        pool_options = self.db_client.options.pool_options
+        body = {
+            'nodes': [f'{host}:{port}' for host, port in self.db_client.nodes],
+            'max_pool_size': pool_options.max_pool_size,
+            'min_pool_size': pool_options.min_pool_size,
+            'wait_queue_timeout': pool_options.wait_queue_timeout,
+            'max_idle_time': pool_options.max_idle_time_seconds,
+        }
+        return web.Response(body=_dumps(body), content_type='application/json')
+
     def setup_routes(self):
         self.app.router.add_post('/feature', self.feature_post_handler)
+        self.app.router.add_post('/feature/batch', self.feature_batch_post_handler)
         self.app.router.add_get('/feature', self.feature_get_handler)
         self.app.router.add_post('/project', self.project_post_handler)
+        self.app.router.add_post('/project/reload', self.project_reload_handler)
         self.app.router.add_post('/debug', self.debug_handler)
+        self.app.router.add_get('/debug/pool', self.debug_pool_handler)
+
+
+class ErrorSniffer(io.TextIOBase):
+    """A write-only stand-in for stdout/stderr that discards what's written to
+    it, only remembering whether the word 'Error' went by. It keeps just
+    enough of the tail of its input to catch a match split across writes.
+    The rest of the text stream interface behaves as a `StringIO`'s would.
+    """
+
+    pattern = 'Error'
+
+    def __init__(self):
+        super().__init__()
+        self.error = False
+        self._tail = ''
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not self.error:
+            buf = self._tail + s
+            self.error = self.pattern in buf
+            self._tail = buf[-(len(self.pattern) - 1):]
+        return len(s)
 
 
 class LabberContext:
     """A context manager to wrap connections to Labber and capture errors
     """
 
+    # The standard streams are process-wide, so only one context may hold
+    # them at a time.
+    _lock = threading.Lock()
+
     def __enter__(self):
-        sys.stdout = sys.stderr = self.buff = StringIO()
+        LabberContext._lock.acquire()
+        sys.stdout = sys.stderr = self.buff = ErrorSniffer()
 
     def __exit__(self, exc_type, exc_value, traceback):
         sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__  # restore I/O
+        LabberContext._lock.release()
         if self._error():
             raise ConnectionError
 
     def _error(self) -> bool:
-        """Checks if an error condition is found in temporary I/O buffer"""
-        return 'Error' in self.buff.getvalue()
+        """Checks if an error condition was written to the temporary I/O buffer"""
+        return self.buff.error
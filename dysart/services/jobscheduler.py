@@ -1,5 +1,7 @@
-from queue import Queue, Empty
-import time
+from collections import deque
+import itertools
+from queue import SimpleQueue, Empty, Full
+import random
 import threading  # todo: prefer asyncio to threading!
 
 from dysart.services.service import Service
@@ -8,12 +10,21 @@ from dysart.messages.errors import JobError
 
 class Job:
     """
-    a job to be run by the scheduler
+    a job to be run by the scheduler. High-priority jobs, like interactive
+    queries, are run ahead of low-priority ones, like feature refreshes. Jobs
+    with the same `key` do the same work, so while one is waiting or running,
+    another put with its key isn't run, but has its callback issued along
+    with the first's.
     """
 
-    def __init__(self, operation, callback):
+    HIGH = 0
+    LOW = 1
+
+    def __init__(self, operation, callback, priority=LOW, key=None):
         self.operation = operation
         self.callback = callback
+        self.priority = priority
+        self.key = key
 
     def run(self):
         self.operation()
@@ -49,71 +60,211 @@ class JobScheduler(Service):
         job.callback()
 
 
-class AsyncJobScheduler(Queue, JobScheduler):
+class AsyncJobScheduler(JobScheduler):
     """
     This is a future JobScheduler class that will probably use asyncio to
-    dispatch jobs. It's not doing anything or really being used right now.
+    dispatch jobs. For now, it runs a fixed set of worker threads, each with
+    its own deques of jobs, one per priority, which only it takes jobs from.
+    A worker that runs out of jobs doesn't steal; it asks a busy worker for
+    some, by posting its number to that worker's mailbox, and sleeps. Between
+    jobs, each worker answers its mail by handing over half of the
+    low-priority jobs it has left. High-priority jobs stay where they're put,
+    so they're never held up behind a handover. With only a handful of
+    workers, this costs less than having thieves contend for the ends of one
+    another's deques.
     """
 
-    loop_rate = 1
+    workers = 4
+    max_jobs = 1024  # the most jobs waiting on each deque
 
-    def __init__(self):
+    def __init__(self, workers=None):
         super().__init__()
         self._is_running = False
-        self.loop_thread = threading.Thread(target=self.loop)
+        if workers is not None:
+            self.workers = workers
+        self.hi_deques = [deque() for _ in range(self.workers)]
+        self.lo_deques = [deque() for _ in range(self.workers)]
+        self.mailboxes = [SimpleQueue() for _ in range(self.workers)]
+        # The worker each worker has asked for jobs, if it's waiting on one
+        self._asked = [None] * self.workers
+        self._next_worker = itertools.cycle(range(self.workers))
+        self._cv = threading.Condition()
+        self._idle = 0  # the number of workers waiting on `_cv`
+        # Jobs coalesced into one with the same key that's yet to finish
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.threads = []
 
     @property
     def jobs(self):
-        return self.queue
-
-    def get_job(self):
-        """Selects the next job to be run"""
-        new_job = self.get_nowait()
-        return new_job
+        return [job for deques in (self.hi_deques, self.lo_deques)
+                for jobs in deques for job in jobs]
 
     def put_job(self, job):
-        """Puts a job into the queue."""
-        self.put(job)
+        """Puts a job into the queue. Jobs are dealt to the workers' deques in
+        turn, skipping those that are full.
+
+        Raises:
+            Full: if every worker already has `max_jobs` of this priority
+        """
+        if job.key is not None:
+            with self._inflight_lock:
+                if job.key in self._inflight:
+                    self._inflight[job.key].append(job)
+                    return
+                self._inflight[job.key] = []
+        deques = self.hi_deques if job.priority == Job.HIGH else self.lo_deques
+        for _ in range(self.workers):
+            jobs = deques[next(self._next_worker)]
+            if len(jobs) < self.max_jobs:
+                jobs.append(job)
+                break
+        else:
+            if job.key is not None:
+                with self._inflight_lock:
+                    del self._inflight[job.key]
+            raise Full
+        # Only take the lock if there's a sleeping worker to wake. Waking them
+        # all lets any whose own deque is still empty ask for the new job.
+        if self._idle:
+            with self._cv:
+                self._cv.notify_all()
+
+    def get_job(self, i: int):
+        """Selects the next job for worker `i` to run: its own newest of the
+        highest priority.
+
+        Raises:
+            IndexError: if worker `i` has no jobs
+        """
+        try:
+            return self.hi_deques[i].pop()
+        except IndexError:
+            return self.lo_deques[i].pop()
 
-    def run_job(self):
-        """Fetch a job from the queue, run it and issue the callback."""
+    def has_jobs(self, i: int) -> bool:
+        return bool(self.hi_deques[i] or self.lo_deques[i])
+
+    def answer_requests(self, i: int) -> None:
+        """Hands over the older half of worker `i`'s low-priority jobs
+        (rounding down) to each worker that has asked it for some, or nothing
+        if it has fewer than two. A worker keeps its last job, since giving it
+        up could leave it to ask for the job back. Must be called with `_cv`
+        held.
+        """
+        jobs = self.lo_deques[i]
+        answered = False
+        while True:
+            try:
+                requester = self.mailboxes[i].get_nowait()
+            except Empty:
+                break
+            own = self.lo_deques[requester]
+            for _ in range(len(jobs) // 2):
+                try:
+                    # Keep them in order, so the oldest is popped soonest
+                    own.appendleft(jobs.popleft())
+                except IndexError:
+                    break
+            self._asked[requester] = None
+            answered = True
+        if answered:
+            self._cv.notify_all()
+
+    def request_jobs(self, i: int) -> None:
+        """Asks some worker with jobs to spare to share them with worker `i`,
+        trying them in turn from a random one. Must be called with `_cv` held.
+        """
+        start = random.randrange(self.workers)
+        for k in range(self.workers):
+            victim = (start + k) % self.workers
+            if victim != i and self.lo_deques[victim]:
+                self._asked[i] = victim
+                self.mailboxes[victim].put(i)
+                return
+
+    def run_job(self, i: int) -> bool:
+        """Fetch a job and run it on worker `i`.
+
+        Returns: whether there was a job to run.
+        """
+        # This is a scheduling point, so see to anyone waiting on us first.
+        if not self.mailboxes[i].empty():
+            with self._cv:
+                self.answer_requests(i)
         try:
-            job = self.get_job()
-        except Empty as e:
-            return
-        # run the job
+            job = self.get_job(i)
+        except IndexError:
+            return False
+        self._run(job)
+        return True
+
+    def _run(self, job):
+        """Runs a job and issues its callback, and those of any jobs that were
+        coalesced into it. Called on a worker thread.
+        """
         try:
             job.run()
         except Exception:
             JobError()
-        # issue callback
+        if job.key is not None:
+            with self._inflight_lock:
+                duplicates = self._inflight.pop(job.key)
+        else:
+            duplicates = ()
         job.callback()
+        for duplicate in duplicates:
+            duplicate.callback()
 
-    def loop(self):
-        # TODO: should use a lock or condition rather than a bool.
+    def loop(self, i: int):
+        """The body of worker `i`."""
         while self._is_running:
-            with cv:
-                while self.empty():
-                    cv.wait()
             try:
-                self.run_job()
+                # Run everything that's waiting before going back to sleep
+                while self.run_job(i):
+                    pass
             except Exception:
                 raise JobError
-            time.sleep(1 / self.loop_rate)
+            with self._cv:
+                self._idle += 1
+                # A job put since the last look will be seen here: `put_job`
+                # can't take the lock to notify until we're waiting.
+                while self._is_running and not self.has_jobs(i):
+                    # Nobody should be left waiting on a worker with nothing
+                    # to give.
+                    self.answer_requests(i)
+                    if self._asked[i] is None:
+                        self.request_jobs(i)
+                    self._cv.wait()
+                self._idle -= 1
 
     def is_running(self):
-        return self.loop_thread.is_alive()
+        return any(thread.is_alive() for thread in self.threads)
 
     def _start(self):
         self._is_running = True
-        self.loop_thread.start()
+        # make new thread instances, since a thread can only be started once
+        self.threads = [threading.Thread(target=self.loop, args=(i,))
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
 
     def _stop(self):
-        self._is_running = False
-        self.loop_thread.stop()
-        self.loop_thread.join()
-        # make a new thread instance
-        # self.loop_thread = threading.Thread(target=self.loop)
+        """Stops the workers, and waits for them to exit. A busy worker
+        doesn't stop after the job it's running: it first runs every job
+        still waiting on its own deques. Any jobs on the deques of workers
+        that were idle stay there, to be run if the scheduler is started
+        again.
+        """
+        with self._cv:
+            self._is_running = False
+            self._cv.notify_all()
+        # wait for the busy workers to run out of jobs
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self._asked = [None] * self.workers
+        self.mailboxes = [SimpleQueue() for _ in range(self.workers)]
 
 
 def make_test_job(i):
@@ -24,15 +24,28 @@ class Service(ABC):
         #     raise AlreadyOnError
         # self._start()
 
-    def stop(self, message=None):
+    def stop(self, message=None, quiet=False):
+        """Stops the service, printing its status. If `quiet`, nothing is
+        printed, and errors are raised to the caller rather than reported.
+        """
+        if quiet:
+            return self.__stop()
         if message is None:
             message = 'Stopping {}...'.format(self.__class__.__name__)
         with StatusMessage(message):
-            if not self.is_running():
-                raise AlreadyOffError
-            self._stop()
-
-    def get_status(self):
+            self.__stop()
+
+    def __stop(self):
+        if not self.is_running():
+            raise AlreadyOffError
+        self._stop()
+
+    def get_status(self, quiet=False):
+        """Prints whether the service is running. If `quiet`, returns it
+        instead.
+        """
+        if quiet:
+            return self.is_running()
         with StatusMessage('{}'.format(self.__class__.__name__),
                            donestr='ON', failstr='OFF'):
             if not self.is_running():
@@ -2,6 +2,7 @@
 Output streams accessible to a user for visualizing status, outputs
 """
 
+import functools
 import os
 import io
 import sys
@@ -12,36 +13,46 @@ from typing import Optional
 class DysDataStream:
     """
     Not really a stream, doesn't inherit from io.BytesIO.
-    ~A singleton queue.
+    ~A singleton queue. Constructing one returns the queue itself, so that
+    calls on it don't go through a delegating wrapper.
     """
 
+    __slots__ = ()
     instance = None
 
-    def __init__(self, *args, **kwargs):
-        if not DysDataStream.instance:
-            DysDataStream.instance = Queue(*args, **kwargs)
-        else:
-            pass  # possibly change this?
-
-    def __getattr__(self, name):
-        return getattr(DysDataStream.instance, name)
-
-    def __setattr__(self, name, val):
-        setattr(DysDataStream.instance, name, val)
+    def __new__(cls, *args, **kwargs) -> Queue:
+        if cls.instance is None:
+            cls.instance = Queue(*args, **kwargs)
+        return cls.instance
 
 
+# The null streams are only opened the first time they're used, and then
+# reused for the life of the process.
+@functools.lru_cache(maxsize=None)
 def _get_stdimg() -> Optional[io.TextIOWrapper]:
     return open(os.devnull, 'wb')
 
 
+@functools.lru_cache(maxsize=None)
 def _get_stdmsg() -> Optional[io.TextIOWrapper]:
     return open(os.devnull, 'wb')
 
 
+@functools.lru_cache(maxsize=None)
 def _get_stdfit() -> Optional[io.TextIOWrapper]:
     return open(os.devnull, 'wb')
 
 
-stdimg = _get_stdimg()
 stdmsg = sys.stdout  # _get_stdmsg()
-stdfit = _get_stdfit()
+_lazy_streams = {
+    'stdimg': _get_stdimg,
+    'stdfit': _get_stdfit,
+}
+
+
+def __getattr__(name: str):
+    """Opens `stdimg` and `stdfit` on first access (PEP 562)"""
+    try:
+        return _lazy_streams[name]()
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
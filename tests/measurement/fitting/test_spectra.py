@@ -24,19 +24,22 @@ np.random.seed(373432261)
 
 class TestSpectrumFittingFunctions(ut.TestCase):
 
-    def setUp(self):
-        # Import sample spectrum data to be used in certain tests
+    @classmethod
+    def setUpClass(cls):
+        # Import sample spectrum data to be used in certain tests. This is read
+        # once for the whole class, rather than once per test; tests mustn't
+        # modify it in place.
         # data_file_name = 'BFC3-8B-spec_thru_Q1_at0Bobbin_rerun.hdf5'
         data_file_name = 'qubit_spectroscopy/20181005_DME_3x3qubits_v2/QBSpectro__TMM10_qu1vBobbin.hdf5'
         qubit_of_interest = 1
         channel_name = 'MQ PulseGen - Voltage, QB%d' % qubit_of_interest
-        log_file = Labber.LogFile(env.data_file_path + data_file_name)
-        (self.x, self.y) = log_file.getTraceXY(entry=-1, y_channel=channel_name)
+        cls.log_file = Labber.LogFile(env.data_file_path + data_file_name)
+        (cls.x, cls.y) = cls.log_file.getTraceXY(entry=-1, y_channel=channel_name)
 
         # Set a tolerable reduced-chi-squared limit for spectrum fits. This is a
         # magic constant that shouldn't be here in future versions.
-        self.redchi_tolerance_absolute = 2e-9
-        self.redchi_tolerance_relative = 1.1
+        cls.redchi_tolerance_absolute = 2e-9
+        cls.redchi_tolerance_relative = 1.1
 
     def test_recursive_linear_search_forward(self):
         """
@@ -112,16 +115,6 @@ class TestSpectrumFittingFunctions(ut.TestCase):
         perfectly overlap?
         """
 
-        def make_spectrum_params(amplitudes, centers, sigmas):
-            """Roll the spectrum parameters into a dict"""
-            params = {'c': 0}
-            # TODO: do this more pythonically with a comprehension or something
-            for i in range(len(amplitudes)):
-                params['_%s_amplitude' % i] = amplitudes[i]
-                params['_%s_centers' % i] = centers[i]
-                params['_%s_sigmas' % i] = sigmas[i]
-            return params
-
         # Make the frequency-domain variable
         low_freq = 4.0e9
         high_freq = 5.0e9
@@ -137,6 +130,18 @@ class TestSpectrumFittingFunctions(ut.TestCase):
         num_num_resonances = 8
         noise_amplitudes = np.logspace(-5, -1, num_noise_amplitudes)
 
+        # The parameter names of every resonance, formatted once up front
+        param_keys = [('_%s_amplitude' % i, '_%s_centers' % i, '_%s_sigmas' % i)
+                      for i in range(num_num_resonances)]
+
+        def make_spectrum_params(amplitudes, centers, sigmas):
+            """Roll the spectrum parameters into a dict"""
+            params = {key: val
+                      for keys, vals in zip(param_keys, zip(amplitudes, centers, sigmas))
+                      for key, val in zip(keys, vals)}
+            params['c'] = 0
+            return params
+
         # Initialize chi-squared array
         redchi = np.empty([5, 8])
 
@@ -0,0 +1,9 @@
+import sys
+import os
+
+# append module root directory to sys.path
+sys.path.append(
+    os.path.dirname(
+        os.path.relpath('../../..')
+    )
+)
@@ -0,0 +1,238 @@
+# Put modules to test on the path
+import env
+# Add modules to test
+import asyncio
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import threading
+import time
+import types
+import unittest as ut
+import dysart.services.dyserver as dyserver
+import aiohttp.web as web
+
+
+class FakeRecord:
+    """Stands in for a RequestRecord, which would be written to the database"""
+
+    def __init__(self, data):
+        self.json = data
+
+
+class FakeRequest(dict):
+    """Stands in for an aiohttp request, carrying just what handlers read"""
+
+    def __init__(self, data, headers=None):
+        super().__init__(record=FakeRecord(data))
+        self.headers = headers or {}
+
+
+class SlowFeature:
+    """A feature whose results take until `release` is set to compute"""
+
+    def __init__(self):
+        self.id = 'slow'
+        self.call_lock = threading.Lock()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def _repr_dict_(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        return {'results': self.calls}
+
+
+class BusyFeature:
+    """A feature whose method notes the order of its calls, and whether any
+    of them overlapped
+    """
+
+    def __init__(self, feature_id):
+        self.id = feature_id
+        self.call_lock = threading.Lock()
+        self.calls = []
+        self.active = 0
+        self.overlapped = False
+
+    def record(self, n):
+        self.active += 1
+        self.overlapped |= self.active > 1
+        time.sleep(0.01)
+        self.calls.append(n)
+        self.active -= 1
+        return n
+
+
+def make_server(features):
+    """Builds a server with a loaded project, without connecting to anything"""
+    server = dyserver.Dyserver.__new__(dyserver.Dyserver)
+    server._get_cache = {}
+    server._get_generations = {}
+    server._get_epoch = 0
+    server._features_by_name = dict(features)
+    server.project = types.SimpleNamespace(
+        features={feature.id: feature for feature in server._features_by_name.values()}
+    )
+    server._dispatch = {
+        (name, 'record'): (feature.id, getattr(feature, 'record', None), False)
+        for name, feature in server._features_by_name.items()
+    }
+    server._executor = ThreadPoolExecutor(max_workers=2)
+    return server
+
+
+class TestFeatureGetCache(ut.TestCase):
+
+    def test_invalidated_during_repr_is_not_cached(self):
+        """
+        A response computed while the feature was invalidated is sent, but
+        not kept: the next request must compute a fresh one.
+        """
+        feature = SlowFeature()
+        server = make_server({'slow': feature})
+        request = FakeRequest({'feature': 'slow'})
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            pending = asyncio.ensure_future(server.feature_get_handler(request))
+            await loop.run_in_executor(None, feature.started.wait, 5)
+            server._invalidate(feature.id)
+            feature.release.set()
+            await pending
+            self.assertNotIn(feature.id, server._get_cache)
+
+            await server.feature_get_handler(request)
+            self.assertEqual(feature.calls, 2)
+            self.assertIn(feature.id, server._get_cache)
+
+        asyncio.run(scenario())
+        server._executor.shutdown()
+
+    def test_cached_response_is_reused(self):
+        feature = SlowFeature()
+        feature.release.set()
+        server = make_server({'slow': feature})
+        request = FakeRequest({'feature': 'slow'})
+
+        async def scenario():
+            await server.feature_get_handler(request)
+            await server.feature_get_handler(request)
+
+        asyncio.run(scenario())
+        server._executor.shutdown()
+        self.assertEqual(feature.calls, 1)
+
+
+class TestFeatureBatch(ut.TestCase):
+
+    def test_calls_on_a_feature_run_in_order(self):
+        """
+        Calls on the same feature in a batch don't overlap, and run in the
+        order given; their values come back in the batch's order.
+        """
+        a, b = BusyFeature('a'), BusyFeature('b')
+        server = make_server({'a': a, 'b': b})
+        calls = [{'feature': name, 'method': 'record', 'args': [n], 'kwargs': {}}
+                 for n, name in enumerate('abababab')]
+        request = FakeRequest({'calls': calls})
+
+        response = asyncio.run(server.feature_batch_post_handler(request))
+        server._executor.shutdown()
+        self.assertEqual(json.loads(response.body), list(range(8)))
+        self.assertEqual(a.calls, [0, 2, 4, 6])
+        self.assertEqual(b.calls, [1, 3, 5, 7])
+        self.assertFalse(a.overlapped or b.overlapped)
+
+
+
+class TestResolveCall(ut.TestCase):
+
+    def test_unknown_names_are_not_found(self):
+        """
+        Calls naming no feature or method are refused with a 404, even when
+        the names aren't strings.
+        """
+        server = make_server({'a': BusyFeature('a')})
+        calls = [
+            {'feature': 'b', 'method': 'record'},
+            {'feature': 'a', 'method': 'missing'},
+            {'feature': ['a'], 'method': 'record'},
+            {'feature': 'a', 'method': {'record': 1}},
+            {'feature': 1, 'method': 'record'},
+        ]
+        for call in calls:
+            with self.subTest(call=call):
+                with self.assertRaises(web.HTTPNotFound):
+                    server._resolve_call(call)
+        server._executor.shutdown()
+
+    def test_get_unknown_feature_is_not_found(self):
+        server = make_server({'a': BusyFeature('a')})
+        for name in ('b', ['a']):
+            with self.subTest(name=name):
+                request = FakeRequest({'feature': name})
+                with self.assertRaises(web.HTTPNotFound):
+                    asyncio.run(server.feature_get_handler(request))
+        server._executor.shutdown()
+
+
+class TestErrorSniffer(ut.TestCase):
+
+    def test_error_split_across_writes(self):
+        sniffer = dyserver.ErrorSniffer()
+        sniffer.write('Connecting... Err')
+        self.assertFalse(sniffer.error)
+        sniffer.write('or: no server')
+        self.assertTrue(sniffer.error)
+
+    def test_stream_interface(self):
+        """
+        Code that checks what kind of stream stdout is finds the answers a
+        StringIO would give, rather than an AttributeError.
+        """
+        sniffer = dyserver.ErrorSniffer()
+        self.assertFalse(sniffer.isatty())
+        self.assertTrue(sniffer.writable())
+        self.assertFalse(sniffer.readable())
+        self.assertIsNone(sniffer.encoding)
+        with self.assertRaises(io.UnsupportedOperation):
+            sniffer.fileno()
+        print('Error', file=sniffer, flush=True)
+        self.assertTrue(sniffer.error)
+
+
+class TestParseAuthorization(ut.TestCase):
+
+    def test_well_formed(self):
+        credentials = b64encode(b'user:pass:word').decode('ascii')
+        user, digest = dyserver.parse_authorization('Basic ' + credentials)
+        self.assertEqual(user, 'user')
+        self.assertEqual(digest, dyserver.Dyserver.hashpass('pass:word'))
+
+    def test_malformed_headers_are_unauthorized(self):
+        """
+        Garbage in the Authorization header is refused, rather than raising
+        an error that would become a 500.
+        """
+        not_utf8 = b64encode(b'\xff\xfe:token').decode('ascii')
+        headers = [
+            '',
+            'Basic',
+            'Basic !!!not base64!!!',
+            'Basic YWJ',
+            'Basic ' + b64encode(b'no separator').decode('ascii'),
+            'Basic ' + not_utf8,
+            'Bearer ' + b64encode(b'user:token').decode('ascii'),
+        ]
+        for header in headers:
+            with self.subTest(header=header):
+                with self.assertRaises(web.HTTPUnauthorized):
+                    dyserver.parse_authorization(header)
+
+
+if __name__ == '__main__':
+    ut.main()
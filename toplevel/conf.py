@@ -7,6 +7,11 @@ import sys
 import shutil
 
 import yaml
+# The C bindings to libyaml are much faster, but aren't always built.
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
 
 # a configuration file is necessary because it contains settings information
 # that will be needed even when the mongodb database is down, or not yet
@@ -19,8 +24,24 @@ dys_path = os.path.abspath(os.path.join(
             __file__, os.path.pardir, os.path.pardir))
 
 config_path = os.path.join(dys_path, CONFIG_FN)
-# Try to ensure that there are at least default values at the expected path.
-if not os.path.exists(config_path):
+
+
+def _read_config_file(path: str) -> dict:
+    """Parses a config file.
+
+    Raises:
+        FileNotFoundError: if there is no config file at `path`
+    """
+    with open(path, 'r') as f:
+        return yaml.load(f, _Loader)
+
+
+try:
+    config = _read_config_file(config_path)
+except FileNotFoundError:
+    # Try to ensure that there are at least default values at the expected
+    # path. This is only checked when reading fails, to save a stat on every
+    # normal startup.
     default_path = os.path.join(dys_path, DEFAULT_CONFIG_FN)
     try:
         shutil.copy2(default_path, config_path)
@@ -29,6 +50,4 @@ if not os.path.exists(config_path):
         print("No config file; failed to copy default config file. Exiting dysart.",
               sys.stderr)
         exit(1)
-
-with open(config_path, 'r') as f:
-    config = yaml.load(f, yaml.Loader)
+    config = _read_config_file(config_path)
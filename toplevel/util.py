@@ -1,34 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
 import os
 import itertools
-import subprocess
+import logging
+from operator import methodcaller
+import sys
 
 import toplevel.conf as conf
+from dysart.messages.errors import ServiceError
+from dysart.messages.messages import StatusMessage
+
+# The command that starts an interactive session. This runs the interpreter
+# that's running us, rather than whichever `python` is first on the PATH.
+_DYPY_CMD = [sys.executable, '-i', os.path.join(conf.dys_path, 'dypy.py')]
+
+# Feature libraries that have been loaded, indexed by path
+_loaded_libraries = {}
+
+
+def _dispatch(call, services, message, **status_args):
+    """Calls a function on each service at once, then reports each outcome in
+    turn. Stopping a service mostly means waiting on another process, so
+    running them together takes about as long as the slowest one, rather than
+    all of them added up. (Reporting afterwards keeps the services' status
+    lines from being interleaved.) Only for calls that return promptly, don't
+    depend on order, and print nothing themselves.
+
+    Args:
+        call: called with each service; it fails by raising
+        services: the services to call it on
+        message: the status line, formatted with the service's class name
+        status_args: further arguments to each `StatusMessage`
+    """
+    with ThreadPoolExecutor(max_workers=len(services) or 1) as executor:
+        futures = [executor.submit(call, service) for service in services]
+    for service, future in zip(services, futures):
+        with StatusMessage(message.format(service.__class__.__name__),
+                           **status_args):
+            future.result()
+
+
+def _check_running(service):
+    """Raises unless a service is running"""
+    if not service.get_status(quiet=True):
+        raise ServiceError
 
 
 def start(*services):
-    """Start all services passed in an iterable or as positional arguments"""
+    """Start all services passed in an iterable or as positional arguments.
+    They're started one at a time, in the order given, on this thread: later
+    services may depend on earlier ones (the server connects to the database),
+    and a service like the server runs in the foreground until interrupted.
+    """
     for service in services:
         service.start()
 
 
 def stop(*services):
     """Stop all services passed in an iterable or as positional arguments"""
-    for service in services:
-        service.stop()
+    _dispatch(methodcaller('stop', quiet=True), services, 'Stopping {}...')
 
 
 def status(*services):
     """Polls all services passed in an iterable or as positional arguments"""
-    for service in services:
-        service.get_status()
+    _dispatch(_check_running, services, '{}', donestr='ON', failstr='OFF')
 
 
 def dypy_session(*args):
     """Launches an interactive Python session with all services running"""
 
-    # run an interpreter subprocess
-    dypy_startup_path = os.path.join(conf.dys_path, 'dypy.py')
-    subprocess.run('python -i {}'.format(dypy_startup_path).split())
+    # The session is the last thing this process does, so replace it with the
+    # interpreter rather than waiting on a child. That skips exit handlers and
+    # drops buffered output, so flush everything first.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    logging.shutdown()
+    os.execv(_DYPY_CMD[0], _DYPY_CMD)
 
 
 def restart(*services):
@@ -38,15 +85,27 @@ def restart(*services):
 
 def load_libraries(*libraries):
     """
-    Loads a collection of Feature libraries into the global namespace
+    Loads a collection of Feature libraries into the global namespace. Each
+    library is only executed the first time it's loaded.
 
     Args:
         libraries: A collection of absolute paths to Feature libraries
     """
-    for i, library in enumerate(libraries):
-        proj_module_path = os.path.join(proj_path)
-        proj_spec = importlib.util.spec_from_file_location(
-            f'lib{i}', proj_module_path
+    for library in libraries:
+        if library in _loaded_libraries:
+            continue
+        # Number the modules across calls, so that their names don't clash
+        lib_spec = importlib.util.spec_from_file_location(
+            f'lib{len(_loaded_libraries)}', library
         )
-        proj = importlib.util.module_from_spec(proj_spec)
-        proj_spec.loader.exec_module(proj)
+        lib = importlib.util.module_from_spec(lib_spec)
+        # Register the module before running it, as the import system does,
+        # so that it can be found by name while it loads.
+        sys.modules[lib_spec.name] = lib
+        try:
+            lib_spec.loader.exec_module(lib)
+        except BaseException:
+            # Don't leave a half-initialized module behind
+            sys.modules.pop(lib_spec.name, None)
+            raise
+        _loaded_libraries[library] = lib